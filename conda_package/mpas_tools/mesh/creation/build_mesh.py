@@ -1,29 +1,51 @@
 from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
 import xarray
-import matplotlib.pyplot as plt
-import cartopy.crs as ccrs
-import cartopy
 
 from mpas_tools.logging import check_call
 
 from mpas_tools.mesh.creation.jigsaw_driver import jigsaw_driver
 from mpas_tools.mesh.creation.jigsaw_to_netcdf import jigsaw_to_netcdf
-from mpas_tools.viz.colormaps import register_sci_viz_colormaps
 from mpas_tools.logging import LoggingContext
 
+try:
+    import h5netcdf
+    # h5netcdf has less serialization overhead than netCDF4-python for the
+    # modest-sized cellWidth fields written below
+    _cell_width_engine = 'h5netcdf'
+except ImportError:
+    _cell_width_engine = None
+
+# HDF5 file-space page size and metadata block size used when writing
+# cellWidth files with paged aggregation
+_fs_page_size = 1 << 22
+_meta_block_size = 8 * 1024 * 1024
+
+# the maximum size of cellWidth chunks along each dimension
+_cell_width_chunk_size = 256
+
+# whether the SciVisColor colormaps have been registered with matplotlib
+_colormaps_registered = False
+
 
 def build_spherical_mesh(cellWidth, lon, lat, earth_radius,
                          out_filename='base_mesh.nc', plot_cellWidth=True,
-                         dir='./', logger=None):
+                         dir='./', logger=None, page_aggregate=False,
+                         jigsaw_in_memory=False):
     """
     Build an MPAS mesh using JIGSAW with the given cell sizes as a function of
     latitude and longitude.
 
     The result is a mesh file stored in ``out_filename`` as well as several
     intermediate files: ``mesh.log``, ``mesh-HFUN.msh``, ``mesh.jig``,
-    ``mesh-MESH.msh``, ``mesh.msh``, and ``mesh_triangles.nc``.
+    ``mesh-MESH.msh`` (unless ``jigsaw_in_memory=True``), ``mesh.msh``, and
+    ``mesh_triangles.nc``.
 
     Parameters
     ----------
@@ -44,7 +66,9 @@ def build_spherical_mesh(cellWidth, lon, lat, earth_radius,
 
     plot_cellWidth : bool, optional
         Whether to produce a plot of ``cellWidth``. If so, it will be written
-        to ``cellWidthGlobal.png``.
+        to ``cellWidthGlobal.png``.  A hash of the data is stored in
+        ``cellWidthGlobal.png.sha`` so the plot is only remade when
+        ``cellWidth``, ``lon`` or ``lat`` change.
 
     dir : str, optional
         A directory in which a temporary directory will be added with files
@@ -52,52 +76,53 @@ def build_spherical_mesh(cellWidth, lon, lat, earth_radius,
 
     logger : logging.Logger, optional
         A logger for the output if not stdout
+
+    page_aggregate : bool, optional
+        Whether to write the ``cellWidth`` file with HDF5 paged aggregation
+        and a large metadata block, which reduces the number of reads needed
+        to reopen it (e.g. on network file systems).  The file is padded to
+        a multiple of the 4 MiB page size and reserves an 8 MiB metadata
+        block, so small ``cellWidth`` files become many times larger.
+        Requires ``h5netcdf``.
+
+    jigsaw_in_memory : bool, optional
+        Whether to run JIGSAW through its library interface and pass the
+        resulting mesh straight to the conversion step, instead of writing
+        and parsing ``mesh-MESH.msh``, which is not written in this case.
+        JIGSAW's output then goes to stdout rather than ``logger``.
     """
 
     with LoggingContext(__name__, logger=logger) as logger:
 
-        da = xarray.DataArray(cellWidth,
-                              dims=['lat', 'lon'],
-                              coords={'lat': lat, 'lon': lon},
-                              name='cellWidth')
+        # single precision is plenty for cell sizes and halves the data to
+        # write and read back; lon and lat stay in double precision to avoid
+        # shifting the grid
+        cellWidth = numpy.ascontiguousarray(cellWidth, dtype=numpy.float32)
+
         cw_filename = 'cellWidthVsLatLon.nc'
-        da.to_netcdf(cw_filename)
-        if plot_cellWidth:
-            register_sci_viz_colormaps()
-            fig = plt.figure(figsize=[16.0, 8.0])
-            ax = plt.axes(projection=ccrs.PlateCarree())
-            ax.set_global()
-            im = ax.imshow(cellWidth, origin='lower',
-                           transform=ccrs.PlateCarree(),
-                           extent=[-180, 180, -90, 90], cmap='3Wbgy5',
-                           zorder=0)
-            ax.add_feature(cartopy.feature.LAND, edgecolor='black', zorder=1)
-            gl = ax.gridlines(
-                crs=ccrs.PlateCarree(),
-                draw_labels=True,
-                linewidth=1,
-                color='gray',
-                alpha=0.5,
-                linestyle='-', zorder=2)
-            gl.top_labels = False
-            gl.right_labels = False
-            plt.title(
-                'Grid cell size, km, min: {:.1f} max: {:.1f}'.format(
-                    cellWidth.min(),cellWidth.max()))
-            plt.colorbar(im, shrink=.60)
-            fig.canvas.draw()
-            plt.tight_layout()
-            plt.savefig('cellWidthGlobal.png', bbox_inches='tight')
-            plt.close()
-
-        logger.info('Step 1. Generate mesh with JIGSAW')
-        jigsaw_driver(cellWidth, lon, lat, on_sphere=True,
-                      earth_radius=earth_radius, logger=logger)
+        # JIGSAW only needs cellWidth in memory, so the cellWidth file is
+        # written in the background while the mesh is generated
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            cw_future = executor.submit(
+                _write_cell_width, cellWidth, dims=['lat', 'lon'],
+                coords={'lat': lat, 'lon': lon}, filename=cw_filename,
+                page_aggregate=page_aggregate, logger=logger)
+
+            if plot_cellWidth:
+                _plot_cell_width(cellWidth, lon, lat, logger)
+
+            logger.info('Step 1. Generate mesh with JIGSAW')
+            mesh = jigsaw_driver(cellWidth, lon, lat, on_sphere=True,
+                                 earth_radius=earth_radius, logger=logger,
+                                 in_memory=jigsaw_in_memory)
+
+            cw_future.result()
 
         logger.info('Step 2. Convert triangles from jigsaw format to netcdf')
         jigsaw_to_netcdf(msh_filename='mesh-MESH.msh',
                          output_name='mesh_triangles.nc', on_sphere=True,
-                         sphere_radius=earth_radius)
+                         sphere_radius=earth_radius, buffered=True,
+                         msh_obj=mesh)
 
         logger.info('Step 3. Convert from triangles to MPAS mesh')
         args = ['MpasMeshConverter.x',
@@ -107,7 +132,8 @@ def build_spherical_mesh(cellWidth, lon, lat, earth_radius,
 
 
 def build_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
-                      out_filename='base_mesh.nc', logger=None):
+                      out_filename='base_mesh.nc', logger=None,
+                      page_aggregate=False, jigsaw_in_memory=False):
     """
     Build a planar MPAS mesh
 
@@ -131,28 +157,163 @@ def build_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
 
     logger : logging.Logger, optional
         A logger for the output if not stdout
+
+    page_aggregate : bool, optional
+        Whether to write the ``cellWidth`` file with HDF5 paged aggregation
+        and a large metadata block, which reduces the number of reads needed
+        to reopen it (e.g. on network file systems).  The file is padded to
+        a multiple of the 4 MiB page size and reserves an 8 MiB metadata
+        block, so small ``cellWidth`` files become many times larger.
+        Requires ``h5netcdf``.
+
+    jigsaw_in_memory : bool, optional
+        Whether to run JIGSAW through its library interface and pass the
+        resulting mesh straight to the conversion step, instead of writing
+        and parsing ``mesh-MESH.msh``, which is not written in this case.
+        JIGSAW's output then goes to stdout rather than ``logger``.
     """
 
     with LoggingContext(__name__, logger=logger) as logger:
 
-        da = xarray.DataArray(cellWidth,
-                              dims=['y', 'x'],
-                              coords={'y': y, 'x': x},
-                              name='cellWidth')
-        cw_filename = 'cellWidthVsXY.nc'
-        da.to_netcdf(cw_filename)
+        # single precision is plenty for cell sizes and halves the data to
+        # write and read back; planar coordinates in meters stay in double
+        # precision to avoid shifting the grid relative to geom_points
+        cellWidth = numpy.ascontiguousarray(cellWidth, dtype=numpy.float32)
 
-        logger.info('Step 1. Generate mesh with JIGSAW')
-        jigsaw_driver(cellWidth, x, y, on_sphere=False,
-                      geom_points=geom_points, geom_edges=geom_edges,
-                      logger=logger)
+        cw_filename = 'cellWidthVsXY.nc'
+        # JIGSAW only needs cellWidth in memory, so the cellWidth file is
+        # written in the background while the mesh is generated
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            cw_future = executor.submit(
+                _write_cell_width, cellWidth, dims=['y', 'x'],
+                coords={'y': y, 'x': x}, filename=cw_filename,
+                page_aggregate=page_aggregate, logger=logger)
+
+            logger.info('Step 1. Generate mesh with JIGSAW')
+            mesh = jigsaw_driver(cellWidth, x, y, on_sphere=False,
+                                 geom_points=geom_points,
+                                 geom_edges=geom_edges, logger=logger,
+                                 in_memory=jigsaw_in_memory)
+
+            cw_future.result()
 
         logger.info('Step 2. Convert triangles from jigsaw format to netcdf')
         jigsaw_to_netcdf(msh_filename='mesh-MESH.msh',
-                         output_name='mesh_triangles.nc', on_sphere=False)
+                         output_name='mesh_triangles.nc', on_sphere=False,
+                         buffered=True, msh_obj=mesh)
 
         logger.info('Step 3. Convert from triangles to MPAS mesh')
         args = ['MpasMeshConverter.x',
                 'mesh_triangles.nc',
                 out_filename]
         check_call(args=args, logger=logger)
+
+
+def _write_cell_width(cellWidth, dims, coords, filename, page_aggregate,
+                      logger):
+    """
+    Write ``cellWidth`` and its coordinates to a NetCDF file, using HDF5
+    paged aggregation and a large metadata block if requested and if
+    ``h5netcdf`` is available
+    """
+    da = xarray.DataArray(cellWidth, dims=dims, coords=coords,
+                          name='cellWidth')
+    encoding = {'cellWidth': {'dtype': 'float32'}}
+    if _cell_width_engine is not None:
+        # uncompressed chunks no larger than the default HDF5 chunk cache
+        # make rereading cellWidth (e.g. when injecting meshDensity) cheap;
+        # the default engine may fall back to a NetCDF3 format without
+        # chunking
+        chunksizes = tuple(min(_cell_width_chunk_size, size)
+                           for size in cellWidth.shape)
+        encoding['cellWidth'].update({'chunksizes': chunksizes,
+                                      'zlib': False,
+                                      'contiguous': False})
+
+    if page_aggregate and _cell_width_engine is None:
+        logger.warning('h5netcdf is not available, so {} will be written '
+                       'without paged aggregation'.format(filename))
+
+    if not page_aggregate or _cell_width_engine is None:
+        da.to_netcdf(filename, encoding=encoding, engine=_cell_width_engine)
+        return
+
+    # xarray can't pass file-creation properties through to h5py, so open
+    # the file ourselves (keyword arguments beyond the mode go to h5py.File)
+    # and let xarray write to it with the same encoding as above
+    h5_file = h5netcdf.File(filename, 'w', fs_strategy='page',
+                            fs_page_size=_fs_page_size,
+                            meta_block_size=_meta_block_size)
+    store = xarray.backends.H5NetCDFStore(h5_file, mode='w')
+    try:
+        da.to_dataset().dump_to_store(store, encoding=encoding)
+    finally:
+        store.close()
+
+
+def _plot_cell_width(cellWidth, lon, lat, logger):
+    """
+    Plot ``cellWidth`` on a global map and write it to ``cellWidthGlobal.png``
+    unless an existing plot was made from the same data
+    """
+    plot_filename = 'cellWidthGlobal.png'
+    hash_filename = '{}.sha'.format(plot_filename)
+
+    hasher = hashlib.blake2b(digest_size=16)
+    for array in [cellWidth, lon, lat]:
+        array = numpy.ascontiguousarray(array)
+        # include the shape and dtype so that, e.g., transposed data with
+        # the same bytes doesn't reuse a stale plot
+        hasher.update('{}{}'.format(array.shape, array.dtype.str).encode())
+        hasher.update(array)
+    digest = hasher.hexdigest()
+
+    if os.path.exists(plot_filename) and os.path.exists(hash_filename):
+        with open(hash_filename) as f:
+            if f.read().strip() == digest:
+                logger.info('cellWidth unchanged -- reusing {}'.format(
+                    plot_filename))
+                return
+
+    # matplotlib and cartopy are slow to import, so only import them when a
+    # plot is actually made
+    import matplotlib.pyplot as plt
+    import cartopy.crs as ccrs
+    import cartopy
+    from mpas_tools.viz.colormaps import register_sci_viz_colormaps
+
+    global _colormaps_registered
+    if not _colormaps_registered:
+        register_sci_viz_colormaps()
+        _colormaps_registered = True
+
+    fig = plt.figure(figsize=[16.0, 8.0])
+    ax = plt.axes(projection=ccrs.PlateCarree())
+    ax.set_global()
+    # pcolormesh avoids cartopy's raster reprojection in imshow
+    im = ax.pcolormesh(lon, lat, cellWidth,
+                       transform=ccrs.PlateCarree(), cmap='3Wbgy5',
+                       shading='auto', rasterized=True, zorder=0)
+    ax.add_feature(cartopy.feature.LAND, edgecolor='black', zorder=1)
+    gl = ax.gridlines(
+        crs=ccrs.PlateCarree(),
+        draw_labels=True,
+        linewidth=1,
+        color='gray',
+        alpha=0.5,
+        linestyle='-', zorder=2)
+    gl.top_labels = False
+    gl.right_labels = False
+    # reduce over a flat, contiguous view of the array
+    cw_flat = numpy.asarray(cellWidth).ravel()
+    cw_min = cw_flat.min()
+    cw_max = cw_flat.max()
+    plt.title(
+        'Grid cell size, km, min: {:.1f} max: {:.1f}'.format(cw_min, cw_max))
+    plt.colorbar(im, shrink=.60)
+    plt.tight_layout()
+    fig.savefig(plot_filename, bbox_inches='tight', dpi=100)
+    plt.close(fig)
+
+    with open(hash_filename, 'w') as f:
+        f.write('{}\n'.format(digest))
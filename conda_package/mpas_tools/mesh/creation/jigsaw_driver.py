@@ -9,7 +9,8 @@ from mpas_tools.logging import check_call
 
 
 def jigsaw_driver(cellWidth, x, y, on_sphere=True, earth_radius=6371.0e3,
-                  geom_points=None, geom_edges=None, logger=None):
+                  geom_points=None, geom_edges=None, logger=None,
+                  in_memory=False):
     """
     A function for building a jigsaw mesh
 
@@ -36,6 +37,18 @@ def jigsaw_driver(cellWidth, x, y, on_sphere=True, earth_radius=6371.0e3,
 
     logger : logging.Logger, optional
         A logger for the output if not stdout
+
+    in_memory : bool, optional
+        Whether to run JIGSAW through its library interface and return the
+        resulting mesh, rather than running the ``jigsaw`` executable, which
+        writes the mesh to ``mesh-MESH.msh``.  The input ``.msh`` and ``.jig``
+        files are written either way for debugging.  JIGSAW's own output goes
+        directly to stdout (not to ``logger``) in this case.
+
+    Returns
+    -------
+    mesh : jigsawpy.jigsaw_msh_t or None
+        The resulting mesh if ``in_memory=True``, otherwise ``None``
     """
     # Authors
     # -------
@@ -48,7 +61,10 @@ def jigsaw_driver(cellWidth, x, y, on_sphere=True, earth_radius=6371.0e3,
     opts.mesh_file = 'mesh-MESH.msh'
     opts.hfun_file = 'mesh-HFUN.msh'
 
-    # save HFUN data to file
+    # save HFUN data to file (jigsawpy requires double precision, whereas
+    # the inputs may be single precision)
+    x = numpy.asarray(x, dtype=jigsawpy.jigsaw_msh_t.REALS_t)
+    y = numpy.asarray(y, dtype=jigsawpy.jigsaw_msh_t.REALS_t)
     hmat = jigsawpy.jigsaw_msh_t()
     if on_sphere:
        hmat.mshID = 'ELLIPSOID-GRID'
@@ -58,7 +74,7 @@ def jigsaw_driver(cellWidth, x, y, on_sphere=True, earth_radius=6371.0e3,
        hmat.mshID = 'EUCLIDEAN-GRID'
        hmat.xgrid = x
        hmat.ygrid = y
-    hmat.value = cellWidth
+    hmat.value = numpy.asarray(cellWidth, dtype=jigsawpy.jigsaw_msh_t.REALS_t)
     jigsawpy.savemsh(opts.hfun_file, hmat)
 
     # define JIGSAW geometry
@@ -81,4 +97,11 @@ def jigsaw_driver(cellWidth, x, y, on_sphere=True, earth_radius=6371.0e3,
     opts.verbosity = +1
 
     savejig(opts.jcfg_file, opts)
+
+    if in_memory:
+        mesh = jigsawpy.jigsaw_msh_t()
+        jigsawpy.lib.jigsaw(opts, geom, mesh, hfun=hmat)
+        return mesh
+
     check_call(['jigsaw', opts.jcfg_file], logger=logger)
+    return None
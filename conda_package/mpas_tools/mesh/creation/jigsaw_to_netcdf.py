@@ -10,14 +10,15 @@ from mpas_tools.mesh.creation.util import circumcenter
 import argparse
 
 
-def jigsaw_to_netcdf(msh_filename, output_name, on_sphere, sphere_radius=None):
+def jigsaw_to_netcdf(msh_filename, output_name, on_sphere, sphere_radius=None,
+                     buffered=True, msh_obj=None):
     """
     Converts mesh data defined in triangle format to NetCDF
 
     Parameters
     ----------
     msh_filename : str
-        A JIGSAW mesh file name
+        A JIGSAW mesh file name, ignored if ``msh_obj`` is provided
     output_name: str
         The name of the output file
     on_sphere : bool
@@ -25,6 +26,13 @@ def jigsaw_to_netcdf(msh_filename, output_name, on_sphere, sphere_radius=None):
     sphere_radius : float, optional
         The radius of the sphere in meters.  If ``on_sphere=True`` this argument
         is required, otherwise it is ignored.
+    buffered : bool, optional
+        Whether to read the JIGSAW mesh file in one go and parse each block
+        of numbers at once, rather than line by line
+    msh_obj : jigsawpy.jigsaw_msh_t, optional
+        A JIGSAW mesh already in memory (e.g. returned by
+        :py:func:`mpas_tools.mesh.creation.jigsaw_driver.jigsaw_driver()`
+        with ``in_memory=True``) to use instead of reading ``msh_filename``
     """
     # Authors: Phillip J. Wolfram, Matthew Hoffman and Xylar Asay-Davis
 
@@ -32,7 +40,10 @@ def jigsaw_to_netcdf(msh_filename, output_name, on_sphere, sphere_radius=None):
 
     # Get dimensions
     # Get nCells
-    msh = readmsh(msh_filename)
+    if msh_obj is not None:
+        msh = _jigsaw_msh_to_dict(msh_obj)
+    else:
+        msh = readmsh(msh_filename, buffered=buffered)
     nCells = msh['POINT'].shape[0]
 
     # Get vertexDegree and nVertices
@@ -102,14 +113,8 @@ def jigsaw_to_netcdf(msh_filename, output_name, on_sphere, sphere_radius=None):
         yVertex_full[iVertex] = pv.y
         zVertex_full[iVertex] = pv.z
 
-    meshDensity_full = grid.createVariable(
-        'meshDensity', 'f8', ('nCells',))
-
-    for iCell in np.arange(0, nCells):
-        meshDensity_full[iCell] = 1.0
-
-    del meshDensity_full
-
+    var = grid.createVariable('meshDensity', 'f8', ('nCells',))
+    var[:] = np.ones(nCells)
     var = grid.createVariable('xCell', 'f8', ('nCells',))
     var[:] = xCell_full
     var = grid.createVariable('yCell', 'f8', ('nCells',))
@@ -130,6 +135,24 @@ def jigsaw_to_netcdf(msh_filename, output_name, on_sphere, sphere_radius=None):
     grid.close()
 
 
+def _jigsaw_msh_to_dict(msh_obj):
+    """
+    Convert a ``jigsawpy.jigsaw_msh_t`` to the same dictionary of arrays
+    produced by ``readmsh()``
+    """
+    if msh_obj.vert3 is not None and msh_obj.vert3.size > 0:
+        point = msh_obj.vert3['coord']
+        ndims = 3
+    else:
+        point = msh_obj.vert2['coord']
+        ndims = 2
+    # copy the points because they get converted to meters in place
+    msh = {'NDIMS': ndims,
+           'POINT': np.array(point, dtype='f8'),
+           'TRIA3': np.asarray(msh_obj.tria3['index'], dtype='i')}
+    return msh
+
+
 def main():
     parser = argparse.ArgumentParser(
         description=__doc__,
@@ -12,14 +12,21 @@ from __future__ import absolute_import, division, print_function, \
 import numpy as np
 
 
-def readmsh(fname):
+def readmsh(fname, buffered=True):
     """
     Reads JIGSAW msh structure and produces a dictionary with values.
 
+    If ``buffered=True``, the file is read in one go and each block of
+    numbers is parsed with a single call rather than line by line, which is
+    much faster for large meshes.
+
     Phillip J. Wolfram
     09/22/2017
     """
 
+    if buffered:
+        return _readmsh_buffered(fname)
+
     dataset = {}
     datavals = {}
     datavals['HEADER'] = ';'
@@ -32,14 +39,7 @@ def readmsh(fname):
                 line = f.readline()
                 continue
             if '=' in line:
-                datavals, dataset = _store_datavals(datavals, dataset)
-                if 'COORD' in line:
-                    name = 'COORD' + line.split('=')[1][0]
-                    datavals[name] = line.split(';')[-1]
-                else:
-                    vals = line.split('=')
-                    value = vals[1] if ';' in vals[1] else int(vals[1])
-                    datavals[vals[0]] = value
+                datavals, dataset = _store_keyval(line, datavals, dataset)
                 line = f.readline()
                 continue
 
@@ -56,6 +56,58 @@ def readmsh(fname):
     return dataset
 
 
+def _readmsh_buffered(fname):  # {{{
+
+    dataset = {}
+    datavals = {}
+    datavals['HEADER'] = ';'
+    datavals['ARRAY'] = None
+    with open(fname) as f:
+        lines = f.readlines()
+
+    nlines = len(lines)
+    iline = 0
+    while iline < nlines:
+        line = lines[iline]
+        if line[0] == '#':
+            datavals['HEADER'] += line[1:] + ';'
+            iline += 1
+            continue
+        if '=' in line:
+            datavals, dataset = _store_keyval(line, datavals, dataset)
+            iline += 1
+            continue
+
+        # a block of numbers, parsed all at once
+        start = iline
+        while iline < nlines and lines[iline][0] != '#' and \
+                '=' not in lines[iline]:
+            iline += 1
+        arrayvals = np.loadtxt(lines[start:iline], delimiter=';', dtype='f8',
+                               ndmin=2)
+        if datavals['ARRAY'] is None:
+            datavals['ARRAY'] = arrayvals
+        else:
+            datavals['ARRAY'] = np.concatenate((datavals['ARRAY'], arrayvals))
+    datavals, dataset = _store_datavals(datavals, dataset)
+
+    return dataset  # }}}
+
+
+def _store_keyval(line, datavals, dataset):  # {{{
+
+    datavals, dataset = _store_datavals(datavals, dataset)
+    if 'COORD' in line:
+        name = 'COORD' + line.split('=')[1][0]
+        datavals[name] = line.split(';')[-1]
+    else:
+        vals = line.split('=')
+        value = vals[1] if ';' in vals[1] else int(vals[1])
+        datavals[vals[0]] = value
+
+    return datavals, dataset  # }}}
+
+
 def _store_datavals(datavals, dataset):  # {{{
 
     if datavals['ARRAY'] is not None:
@@ -1,6 +1,12 @@
 from __future__ import absolute_import, division, print_function, \
     unicode_literals
 
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import netCDF4
+
 from mpas_tools.mesh.creation import build_spherical_mesh as \
     create_spherical_mesh
 from mpas_tools.mesh.creation import build_planar_mesh as create_planar_mesh
@@ -18,7 +24,8 @@ def build_spherical_mesh(cellWidth, lon, lat, out_filename='base_mesh.nc',
                          plot_cellWidth=True, vtk_dir='base_mesh_vtk',
                          preserve_floodplain=False, floodplain_elevation=20.0,
                          do_inject_bathymetry=False, logger=None,
-                         use_progress_bar=True):
+                         use_progress_bar=True, make_vtk=False,
+                         parallel_vtk=False):
     """
     Build an MPAS mesh using JIGSAW with the given cell sizes as a function of
     latitude and longitude
@@ -47,7 +54,7 @@ def build_spherical_mesh(cellWidth, lon, lat, out_filename='base_mesh.nc',
 
     vtk_dir : str, optional
         The name of the directory where mesh data will be extracted for viewing
-        in ParaVeiw.
+        in ParaVeiw if ``make_vtk=True``.
 
     preserve_floodplain : bool, optional
         Whether a flood plain (bathymetry above z = 0) should  be preserved in
@@ -65,6 +72,21 @@ def build_spherical_mesh(cellWidth, lon, lat, out_filename='base_mesh.nc',
 
     use_progress_bar : bool, optional
         Whether to display progress bars (problematic in logging to a file)
+
+    make_vtk : bool, optional
+        Whether to extract VTK files from the mesh into ``vtk_dir`` for
+        viewing in ParaView
+
+    parallel_vtk : bool, optional
+        If ``make_vtk=True``, whether to extract the VTK files in parallel
+        with injecting bathymetry and the floodplain mask.  If so, the VTK
+        files are extracted from a copy of the mesh made before these
+        injections, so they will not include ``bottomDepthObserved`` or
+        ``cellSeedMask``.  The injections run in a separate process, which
+        is started with ``spawn`` on macOS (and with ``forkserver`` on Linux
+        from python 3.14), so a script calling this function with
+        ``parallel_vtk=True`` must do so under an
+        ``if __name__ == '__main__':`` guard.
     """
 
     with LoggingContext(__name__, logger=logger) as logger:
@@ -74,20 +96,29 @@ def build_spherical_mesh(cellWidth, lon, lat, out_filename='base_mesh.nc',
         create_spherical_mesh(cellWidth, lon, lat, earth_radius,  out_filename,
                               plot_cellWidth, logger=logger)
 
-        logger.info('Step 4. Inject meshDensity into the mesh file')
-        inject_spherical_meshDensity(cellWidth, lon, lat,
-                                     mesh_filename=out_filename)
+        # the mesh file is opened once and shared by all the injection steps
+        # (_shared_steps() closes it before extracting VTK files)
+        nc_mesh = netCDF4.Dataset(out_filename, 'r+')
+        try:
+            logger.info('Step 4. Inject meshDensity into the mesh file')
+            inject_spherical_meshDensity(cellWidth, lon, lat,
+                                         mesh_filename=nc_mesh)
 
-        _shared_steps(out_filename, vtk_dir, preserve_floodplain,
-                      floodplain_elevation, do_inject_bathymetry, logger,
-                      use_progress_bar)
+            _shared_steps(out_filename, nc_mesh, vtk_dir,
+                          preserve_floodplain, floodplain_elevation,
+                          do_inject_bathymetry, logger, use_progress_bar,
+                          make_vtk, parallel_vtk)
+        finally:
+            if nc_mesh.isopen():
+                nc_mesh.close()
 
 
 def build_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
                       out_filename='base_mesh.nc', vtk_dir='base_mesh_vtk',
                       preserve_floodplain=False, floodplain_elevation=20.0,
                       do_inject_bathymetry=False, logger=None,
-                      use_progress_bar=True):
+                      use_progress_bar=True, make_vtk=False,
+                      parallel_vtk=False):
     """
     Build a planar MPAS mesh
 
@@ -111,7 +142,7 @@ def build_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
 
     vtk_dir : str, optional
         The name of the directory where mesh data will be extracted for viewing
-        in ParaVeiw.
+        in ParaVeiw if ``make_vtk=True``.
 
     preserve_floodplain : bool, optional
         Whether a flood plain (bathymetry above z = 0) should  be preserved in
@@ -129,6 +160,21 @@ def build_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
 
     use_progress_bar : bool, optional
         Whether to display progress bars (problematic in logging to a file)
+
+    make_vtk : bool, optional
+        Whether to extract VTK files from the mesh into ``vtk_dir`` for
+        viewing in ParaView
+
+    parallel_vtk : bool, optional
+        If ``make_vtk=True``, whether to extract the VTK files in parallel
+        with injecting bathymetry and the floodplain mask.  If so, the VTK
+        files are extracted from a copy of the mesh made before these
+        injections, so they will not include ``bottomDepthObserved`` or
+        ``cellSeedMask``.  The injections run in a separate process, which
+        is started with ``spawn`` on macOS (and with ``forkserver`` on Linux
+        from python 3.14), so a script calling this function with
+        ``parallel_vtk=True`` must do so under an
+        ``if __name__ == '__main__':`` guard.
     """
 
     with LoggingContext(__name__, logger=logger) as logger:
@@ -136,36 +182,99 @@ def build_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
         create_planar_mesh(cellWidth, x, y, geom_points, geom_edges,
                            out_filename, logger=logger)
 
-        logger.info('Step 4. Inject meshDensity into the mesh file')
-        inject_planar_meshDensity(cellWidth, x, y, mesh_filename=out_filename)
+        # the mesh file is opened once and shared by all the injection steps
+        # (_shared_steps() closes it before extracting VTK files)
+        nc_mesh = netCDF4.Dataset(out_filename, 'r+')
+        try:
+            logger.info('Step 4. Inject meshDensity into the mesh file')
+            inject_planar_meshDensity(cellWidth, x, y, mesh_filename=nc_mesh)
 
-        _shared_steps(out_filename, vtk_dir, preserve_floodplain,
-                      floodplain_elevation, do_inject_bathymetry, logger,
-                      use_progress_bar)
+            _shared_steps(out_filename, nc_mesh, vtk_dir,
+                          preserve_floodplain, floodplain_elevation,
+                          do_inject_bathymetry, logger, use_progress_bar,
+                          make_vtk, parallel_vtk)
+        finally:
+            if nc_mesh.isopen():
+                nc_mesh.close()
 
 
-def _shared_steps(out_filename, vtk_dir, preserve_floodplain,
+def _shared_steps(out_filename, nc_mesh, vtk_dir, preserve_floodplain,
                   floodplain_elevation, do_inject_bathymetry, logger,
-                  use_progress_bar):
+                  use_progress_bar, make_vtk, parallel_vtk):
     step = 5
 
-    if do_inject_bathymetry:
-        logger.info('Step {}. Injecting bathymetry'.format(step))
-        inject_bathymetry(mesh_file=out_filename)
-        step += 1
-
-    if preserve_floodplain:
-        logger.info('Step {}. Injecting flag to preserve floodplain'.format(
-            step))
-        inject_preserve_floodplain(mesh_file=out_filename,
-                                   floodplain_elevation=floodplain_elevation)
-        step += 1
-
-    logger.info('Step {}. Create vtk file for visualization'.format(step))
-    extract_vtk(ignore_time=True, lonlat=True, dimension_list=['maxEdges='],
-                variable_list=['allOnCells'], filename_pattern=out_filename,
-                out_dir=vtk_dir, use_progress_bar=use_progress_bar)
+    if make_vtk and parallel_vtk and \
+            (do_inject_bathymetry or preserve_floodplain):
+        # the injections modify the mesh file in place and the floodplain
+        # mask is computed from the bathymetry, so they run one after the
+        # other in a worker process while VTK extraction runs here on a
+        # snapshot of the mesh
+        nc_mesh.close()
+        vtk_src_filename = '{}_vtk_src.nc'.format(
+            os.path.splitext(out_filename)[0])
+        logger.info('Step {}. Injecting bathymetry and/or flag to preserve '
+                    'floodplain and creating vtk file for visualization in '
+                    'parallel'.format(step))
+        try:
+            shutil.copyfile(out_filename, vtk_src_filename)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(
+                    _inject_bathymetry_and_floodplain, out_filename,
+                    do_inject_bathymetry, preserve_floodplain,
+                    floodplain_elevation)
+                _extract_vtk(vtk_src_filename, vtk_dir, use_progress_bar)
+                future.result()
+        finally:
+            # don't leave a full copy of the mesh behind, even on failure
+            if os.path.exists(vtk_src_filename):
+                os.remove(vtk_src_filename)
+    else:
+        if do_inject_bathymetry:
+            logger.info('Step {}. Injecting bathymetry'.format(step))
+            inject_bathymetry(mesh_file=nc_mesh)
+            step += 1
+
+        if preserve_floodplain:
+            logger.info('Step {}. Injecting flag to preserve '
+                        'floodplain'.format(step))
+            inject_preserve_floodplain(
+                mesh_file=nc_mesh,
+                floodplain_elevation=floodplain_elevation)
+            step += 1
+
+        # this flushes all the injected fields to disk at once
+        nc_mesh.close()
+
+        if make_vtk:
+            logger.info('Step {}. Create vtk file for visualization'.format(
+                step))
+            _extract_vtk(out_filename, vtk_dir, use_progress_bar)
 
     logger.info("***********************************************")
     logger.info("**    The global mesh file is {}   **".format(out_filename))
     logger.info("***********************************************")
+
+
+def _inject_bathymetry_and_floodplain(out_filename, do_inject_bathymetry,
+                                      preserve_floodplain,
+                                      floodplain_elevation):
+    """
+    Inject bathymetry and/or the flag to preserve the floodplain, in that
+    order, into the mesh file
+    """
+    with netCDF4.Dataset(out_filename, 'r+') as nc_mesh:
+        if do_inject_bathymetry:
+            inject_bathymetry(mesh_file=nc_mesh)
+
+        if preserve_floodplain:
+            inject_preserve_floodplain(
+                mesh_file=nc_mesh, floodplain_elevation=floodplain_elevation)
+
+
+def _extract_vtk(filename, vtk_dir, use_progress_bar):
+    """
+    Extract VTK files for all cell fields in the mesh for viewing in ParaView
+    """
+    extract_vtk(ignore_time=True, lonlat=True, dimension_list=['maxEdges='],
+                variable_list=['allOnCells'], filename_pattern=filename,
+                out_dir=vtk_dir, use_progress_bar=use_progress_bar)
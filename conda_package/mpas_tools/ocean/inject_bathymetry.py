@@ -15,8 +15,12 @@ import sys
 
 
 def inject_bathymetry(mesh_file):
-    # Open NetCDF mesh file and read mesh points
-    nc_mesh = nc4.Dataset(mesh_file, 'r+')
+    # Open NetCDF mesh file (unless it is already open in 'r+' mode) and read
+    # mesh points
+    if isinstance(mesh_file, nc4.Dataset):
+        nc_mesh = mesh_file
+    else:
+        nc_mesh = nc4.Dataset(mesh_file, 'r+')
     lon_mesh = np.mod(
         nc_mesh.variables['lonCell'][:] + np.pi,
         2 * np.pi) - np.pi
@@ -38,7 +42,8 @@ def inject_bathymetry(mesh_file):
 
     # Write to mesh file
     nc_mesh.variables['bottomDepthObserved'][:] = bathymetry
-    nc_mesh.close()
+    if nc_mesh is not mesh_file:
+        nc_mesh.close()
 
 
 def interpolate_SRTM(lon_pts, lat_pts):
@@ -91,6 +96,8 @@ def interpolate_SRTM(lon_pts, lat_pts):
     end = timeit.default_timer()
     print(end - start, " seconds")
 
+    nc_data.close()
+
     return bathymetry
 
 
@@ -69,8 +69,9 @@ def inject_spherical_meshDensity(cellWidth, lon, lat, mesh_filename):
     lat : ndarray
         longitude in degrees (length m and between -90 and 90)
 
-    mesh_filename : str
-        The mesh file to add ``meshDensity`` to
+    mesh_filename : str or netCDF4.Dataset
+        The mesh file to add ``meshDensity`` to, or the mesh already open in
+        ``'r+'`` mode, in which case it is left open
     """
 
     minCellWidth = cellWidth.min()
@@ -81,7 +82,10 @@ def inject_spherical_meshDensity(cellWidth, lon, lat, mesh_filename):
         cellWidth.max()))
 
     print('Open unstructured MPAS mesh file...')
-    ds = nc4.Dataset(mesh_filename, 'r+')
+    if isinstance(mesh_filename, nc4.Dataset):
+        ds = mesh_filename
+    else:
+        ds = nc4.Dataset(mesh_filename, 'r+')
     meshDensity = ds.variables['meshDensity']
     lonCell = ds.variables['lonCell'][:]
     latCell = ds.variables['latCell'][:]
@@ -94,7 +98,8 @@ def inject_spherical_meshDensity(cellWidth, lon, lat, mesh_filename):
 
     meshDensity[:] = mpasMeshDensity
 
-    ds.close()
+    if ds is not mesh_filename:
+        ds.close()
 
 
 def inject_planar_meshDensity(cellWidth, x, y, mesh_filename):
@@ -112,8 +117,9 @@ def inject_planar_meshDensity(cellWidth, x, y, mesh_filename):
     x, y : ndarray
         Planar coordinates in meters
 
-    mesh_filename : str
-        The mesh file to add ``meshDensity`` to
+    mesh_filename : str or netCDF4.Dataset
+        The mesh file to add ``meshDensity`` to, or the mesh already open in
+        ``'r+'`` mode, in which case it is left open
     """
     minCellWidth = cellWidth.min()
     meshDensityVsXY = (minCellWidth / cellWidth)**4
@@ -121,7 +127,10 @@ def inject_planar_meshDensity(cellWidth, x, y, mesh_filename):
     print('  maximum cell width in grid definition: {0:.0f} km'.format(cellWidth.max()))
 
     print('Open unstructured MPAS mesh file...')
-    ds = nc4.Dataset(mesh_filename, 'r+')
+    if isinstance(mesh_filename, nc4.Dataset):
+        ds = mesh_filename
+    else:
+        ds = nc4.Dataset(mesh_filename, 'r+')
     meshDensity = ds.variables['meshDensity']
     xCell = ds.variables['xCell'][:]
     yCell = ds.variables['xCell'][:]
@@ -131,7 +140,8 @@ def inject_planar_meshDensity(cellWidth, x, y, mesh_filename):
 
     meshDensity[:] = mpasMeshDensity
 
-    ds.close()
+    if ds is not mesh_filename:
+        ds.close()
 
 
 if __name__ == "__main__":
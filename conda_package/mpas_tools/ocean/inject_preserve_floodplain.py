@@ -7,7 +7,11 @@ import argparse
 
 def inject_preserve_floodplain(mesh_file, floodplain_elevation):
 
-    nc_mesh = nc4.Dataset(mesh_file, 'r+')
+    # the mesh may already be open in 'r+' mode, in which case it is left open
+    if isinstance(mesh_file, nc4.Dataset):
+        nc_mesh = mesh_file
+    else:
+        nc_mesh = nc4.Dataset(mesh_file, 'r+')
     nc_vars = nc_mesh.variables.keys()
 
     if 'cellSeedMask' not in nc_vars:
@@ -15,7 +19,8 @@ def inject_preserve_floodplain(mesh_file, floodplain_elevation):
     nc_mesh.variables['cellSeedMask'][:] = \
         nc_mesh.variables['bottomDepthObserved'][:] < floodplain_elevation
 
-    nc_mesh.close()
+    if nc_mesh is not mesh_file:
+        nc_mesh.close()
 
 
 def main():
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+import logging
+
+import numpy as np
+import pytest
+from netCDF4 import Dataset
+
+from mpas_tools.mesh.creation.build_mesh import _write_cell_width
+
+
+def test_write_cell_width_page_aggregate(tmp_path):
+    pytest.importorskip('h5netcdf')
+
+    lon = np.linspace(-180., 180., 37)
+    lat = np.linspace(-90., 90., 19)
+    cellWidth = 240. * np.ones((len(lat), len(lon)), dtype=np.float32)
+    coords = {'lat': lat, 'lon': lon}
+    logger = logging.getLogger(__name__)
+
+    default_filename = str(tmp_path / 'cellWidth_default.nc')
+    paged_filename = str(tmp_path / 'cellWidth_paged.nc')
+    _write_cell_width(cellWidth, dims=['lat', 'lon'], coords=coords,
+                      filename=default_filename, page_aggregate=False,
+                      logger=logger)
+    _write_cell_width(cellWidth, dims=['lat', 'lon'], coords=coords,
+                      filename=paged_filename, page_aggregate=True,
+                      logger=logger)
+
+    with Dataset(default_filename) as ds_default, \
+            Dataset(paged_filename) as ds_paged:
+        assert ds_paged.variables.keys() == ds_default.variables.keys()
+        for var in ds_default.variables:
+            var_default = ds_default.variables[var]
+            var_paged = ds_paged.variables[var]
+            assert var_paged.dimensions == var_default.dimensions
+            assert var_paged.dtype == var_default.dtype
+            assert var_paged.chunking() == var_default.chunking()
+            assert var_paged.ncattrs() == var_default.ncattrs()
+            for attr in var_default.ncattrs():
+                np.testing.assert_array_equal(var_paged.getncattr(attr),
+                                              var_default.getncattr(attr))
+            np.testing.assert_array_equal(var_paged[:], var_default[:])
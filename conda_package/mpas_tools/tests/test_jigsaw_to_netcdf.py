@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+from types import SimpleNamespace
+
+import numpy as np
+from netCDF4 import Dataset
+
+from mpas_tools.mesh.creation.jigsaw_driver import jigsaw_driver
+from mpas_tools.mesh.creation.jigsaw_to_netcdf import jigsaw_to_netcdf
+
+
+def test_jigsaw_to_netcdf_msh_obj(tmp_path):
+    earth_radius = 6371.0e3
+    coords, triangles = _get_octahedron(earth_radius * 1e-3)
+
+    # the structured arrays used by jigsawpy.jigsaw_msh_t
+    vert2 = np.empty(0, dtype=[('coord', np.float64, 2),
+                               ('IDtag', np.int32)])
+    vert3 = np.empty(len(coords), dtype=[('coord', np.float64, 3),
+                                         ('IDtag', np.int32)])
+    vert3['coord'] = coords
+    vert3['IDtag'] = 0
+    tria3 = np.empty(len(triangles), dtype=[('index', np.int32, 3),
+                                            ('IDtag', np.int32)])
+    tria3['index'] = triangles
+    tria3['IDtag'] = 0
+    msh_obj = SimpleNamespace(vert2=vert2, vert3=vert3, tria3=tria3)
+
+    obj_filename = str(tmp_path / 'mesh_triangles_obj.nc')
+    jigsaw_to_netcdf(msh_filename=None, output_name=obj_filename,
+                     on_sphere=True, sphere_radius=earth_radius,
+                     msh_obj=msh_obj)
+
+    msh_filename = str(tmp_path / 'mesh-MESH.msh')
+    _write_msh(msh_filename, coords, triangles)
+    file_filename = str(tmp_path / 'mesh_triangles_file.nc')
+    jigsaw_to_netcdf(msh_filename=msh_filename, output_name=file_filename,
+                     on_sphere=True, sphere_radius=earth_radius)
+
+    with Dataset(obj_filename) as ds_obj, Dataset(file_filename) as ds_file:
+        assert ds_obj.dimensions['nCells'].size == len(coords)
+        assert ds_obj.dimensions['nVertices'].size == len(triangles)
+
+        # km to m
+        for index, var in enumerate(['xCell', 'yCell', 'zCell']):
+            np.testing.assert_allclose(ds_obj.variables[var][:],
+                                       1e3 * coords[:, index])
+
+        # zero- to one-based indexing
+        np.testing.assert_array_equal(ds_obj.variables['cellsOnVertex'][:],
+                                      triangles + 1)
+
+        assert ds_obj.variables.keys() == ds_file.variables.keys()
+        for var in ds_file.variables:
+            np.testing.assert_array_equal(ds_obj.variables[var][:],
+                                          ds_file.variables[var][:])
+
+
+def test_jigsaw_driver_in_memory(tmp_path, monkeypatch):
+    # jigsaw_driver() writes its files to the working directory
+    monkeypatch.chdir(tmp_path)
+
+    earth_radius = 6371.0e3
+    # a coarse, uniform 240 km sphere
+    lon = np.linspace(-180., 180., 37)
+    lat = np.linspace(-90., 90., 19)
+    cellWidth = 240. * np.ones((len(lat), len(lon)))
+
+    jigsaw_driver(cellWidth, lon, lat, on_sphere=True,
+                  earth_radius=earth_radius)
+    jigsaw_to_netcdf(msh_filename='mesh-MESH.msh',
+                     output_name='mesh_triangles_file.nc', on_sphere=True,
+                     sphere_radius=earth_radius)
+
+    mesh = jigsaw_driver(cellWidth, lon, lat, on_sphere=True,
+                         earth_radius=earth_radius, in_memory=True)
+    # the library returns spherical meshes as 3D points
+    assert mesh.vert3.size > 0
+    jigsaw_to_netcdf(msh_filename=None,
+                     output_name='mesh_triangles_obj.nc', on_sphere=True,
+                     sphere_radius=earth_radius, msh_obj=mesh)
+
+    with Dataset('mesh_triangles_obj.nc') as ds_obj, \
+            Dataset('mesh_triangles_file.nc') as ds_file:
+        for dim in ['nCells', 'nVertices']:
+            assert ds_obj.dimensions[dim].size == \
+                ds_file.dimensions[dim].size
+        assert ds_obj.dimensions['nCells'].size > 0
+
+        np.testing.assert_array_equal(ds_obj.variables['cellsOnVertex'][:],
+                                      ds_file.variables['cellsOnVertex'][:])
+        # the mesh file is text, so allow for rounding of its coordinates
+        # (in km) -- 10 m is far smaller than the 240 km cells
+        for var in ['xCell', 'yCell', 'zCell', 'xVertex', 'yVertex',
+                    'zVertex']:
+            np.testing.assert_allclose(ds_obj.variables[var][:],
+                                       ds_file.variables[var][:],
+                                       rtol=0., atol=10.)
+
+
+def _get_octahedron(radius):
+    coords = radius * np.array([[1., 0., 0.],
+                                [-1., 0., 0.],
+                                [0., 1., 0.],
+                                [0., -1., 0.],
+                                [0., 0., 1.],
+                                [0., 0., -1.]])
+    triangles = np.array([[0, 2, 4],
+                          [2, 1, 4],
+                          [1, 3, 4],
+                          [3, 0, 4],
+                          [2, 0, 5],
+                          [1, 2, 5],
+                          [3, 1, 5],
+                          [0, 3, 5]], dtype=np.int32)
+    return coords, triangles
+
+
+def _write_msh(filename, coords, triangles):
+    with open(filename, 'w') as f:
+        f.write('# mesh-MESH.msh; created by jigsaw\n')
+        f.write('MSHID=3;EUCLIDEAN-MESH\n')
+        f.write('NDIMS=3\n')
+        f.write('POINT={}\n'.format(len(coords)))
+        for x, y, z in coords:
+            # repr of a float round-trips exactly
+            f.write('{!r};{!r};{!r};0\n'.format(float(x), float(y),
+                                                  float(z)))
+        f.write('TRIA3={}\n'.format(len(triangles)))
+        for i, j, k in triangles:
+            f.write('{};{};{};0\n'.format(i, j, k))
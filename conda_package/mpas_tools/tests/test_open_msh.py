@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+
+from mpas_tools.mesh.creation.open_msh import readmsh
+
+
+_mesh_msh = """# mesh.msh; created by jigsaw
+MSHID=3;EUCLIDEAN-MESH
+NDIMS=2
+POINT=4
+0.0;0.0;0
+1.0;0.0;0
+1.0;1.0;0
+0.0;1.0;0
+EDGE2=2
+0;1;0
+1;2;0
+TRIA3=2
+0;1;2;0
+0;2;3;0
+"""
+
+_hfun_msh = """# mesh-HFUN.msh; created by jigsawpy
+MSHID=3;ELLIPSOID-GRID
+NDIMS=2
+COORD=1;3
+-1.0
+0.0
+1.0
+COORD=2;2
+-0.5
+0.5
+VALUE=6;1
+240.0
+120.0
+60.0
+60.0
+120.0
+240.0
+"""
+
+_one_row_msh = """# one_row.msh; created by jigsaw
+MSHID=3;EUCLIDEAN-MESH
+NDIMS=3
+POINT=1
+6371.0;0.0;0.0;0
+"""
+
+
+@pytest.mark.parametrize('contents', [_mesh_msh, _hfun_msh, _one_row_msh],
+                         ids=['mesh', 'hfun', 'one_row'])
+def test_readmsh_buffered(tmp_path, contents):
+    filename = str(tmp_path / 'test.msh')
+    with open(filename, 'w') as f:
+        f.write(contents)
+
+    unbuffered = readmsh(filename, buffered=False)
+    buffered = readmsh(filename, buffered=True)
+
+    assert sorted(buffered.keys()) == sorted(unbuffered.keys())
+    for key in unbuffered:
+        if isinstance(unbuffered[key], np.ndarray):
+            assert buffered[key].dtype == unbuffered[key].dtype
+            np.testing.assert_array_equal(buffered[key], unbuffered[key])
+        else:
+            assert buffered[key] == unbuffered[key]
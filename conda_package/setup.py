@@ -10,6 +10,8 @@ install_requires = [
     'cartopy',
     'cmocean',
     'dask',
+    'h5netcdf',
+    'h5py >=3.8',
     'inpoly',
     'matplotlib >=3.9.0',
     'netcdf4',